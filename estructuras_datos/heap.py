@@ -1,60 +1,106 @@
 """
 MinHeap: Almacena tuplas (score, item_id) y usa una comparación 
 para mantener el elemento con menor score en la raíz.
+
+El heap es d-ario: cada nodo tiene hasta *d* hijos.  Con d = 4 (por
+defecto) el árbol tiene la mitad de niveles que uno binario, así cada
+sift recorre la mitad de iteraciones del intérprete a cambio de comparar
+hasta 4 hijos por nivel.  ``MinHeap(d=2)`` es el heap binario clásico.
+
+El arreglo guarda el árbol por niveles (orden BFS, el layout de
+Eytzinger): la raíz en 0 y los *d* hijos del nodo *i* en las posiciones
+contiguas ``d*i + 1 .. d*i + d``.  Cada paso de ``min_heapify`` lee un
+bloque contiguo de hijos y los primeros niveles, que se recorren en cada
+operación, quedan juntos al inicio del arreglo.
+
+Internamente las tuplas se guardan en formato SoA: los scores en un
+``array('d')`` (8 bytes contiguos por elemento) y los item_id en una
+lista paralela.  Las comparaciones miran primero el score y solo ante
+un empate el item_id, igual que la comparación de tuplas.  Las tuplas
+(score, item_id) solo se arman al devolver un elemento.
 """
 
+from array import array
+
 
 class MinHeap:
-    """Min-heap que almacena tuplas (score, item_id)."""
+    """Min-heap d-ario que almacena tuplas (score, item_id)."""
+
+    __slots__ = ("d", "_scores", "_ids")
 
-    def __init__(self):
-        self._data: list = []
+    def __init__(self, d: int = 4):
+        if d < 2:
+            raise ValueError("El heap debe tener al menos 2 hijos por nodo")
+        self.d = d
+        self._scores = array("d")
+        self._ids: list = []
 
     # ------------------------------------------------------------------ #
     # Índices                                                              #
     # ------------------------------------------------------------------ #
-    @staticmethod
-    def parent(i: int) -> int:
-        return (i - 1) // 2
+    def parent(self, i: int) -> int:
+        return (i - 1) // self.d
 
-    @staticmethod
-    def left(i: int) -> int:
-        return 2 * i + 1
+    def child(self, i: int, j: int) -> int:
+        """Índice del *j*-ésimo hijo (0 <= j < d) del nodo *i*."""
+        return self.d * i + 1 + j
 
-    @staticmethod
-    def right(i: int) -> int:
-        return 2 * i + 2
+    def left(self, i: int) -> int:
+        """Primer hijo del nodo *i*."""
+        return self.d * i + 1
+
+    def right(self, i: int) -> int:
+        """Último hijo del nodo *i*."""
+        return self.d * i + self.d
 
     # ------------------------------------------------------------------ #
     # Mantener propiedad min-heap (MIN-HEAPIFY)                     #
     # ------------------------------------------------------------------ #
     def min_heapify(self, i: int) -> None:
         """Corrige el sub-árbol con raíz en *i* para mantener la
-        propiedad min-heap.  Implementación recursiva."""
-        n = len(self._data)
-        smallest = i
-        l = self.left(i)
-        r = self.right(i)
-
-        if l < n and self._data[l] < self._data[smallest]:
-            smallest = l
-        if r < n and self._data[r] < self._data[smallest]:
-            smallest = r
-
-        if smallest != i:
-            self._data[i], self._data[smallest] = (
-                self._data[smallest],
-                self._data[i],
-            )
-            self.min_heapify(smallest)
+        propiedad min-heap.
+
+        Implementación iterativa con la técnica del "hueco": en lugar de
+        intercambiar en cada nivel, se guarda el elemento desplazado en
+        (*x_score*, *x_id*), se sube el hijo menor hacia el hueco y el
+        elemento se escribe una sola vez en su posición final.  Los
+        índices de los hijos se calculan en línea para evitar llamadas a
+        ``child``.
+        """
+        scores = self._scores
+        ids = self._ids
+        n = len(scores)
+        d = self.d
+        x_score = scores[i]
+        x_id = ids[i]
+        while True:
+            first = d * i + 1
+            if first >= n:
+                break
+            child = first
+            s_min = scores[first]
+            for j in range(first + 1, min(first + d, n)):
+                s = scores[j]
+                if s < s_min or (s == s_min and ids[j] < ids[child]):
+                    child = j
+                    s_min = s
+            if s_min < x_score or (s_min == x_score and ids[child] < x_id):
+                scores[i] = s_min
+                ids[i] = ids[child]
+                i = child
+            else:
+                break
+        scores[i] = x_score
+        ids[i] = x_id
 
     # ------------------------------------------------------------------ #
     # Construir heap desde arreglo — O(n).                               #
     # ------------------------------------------------------------------ #
-    def build_min_heap(self, array: list) -> None:
-        """Construye el heap *in-place* a partir de *array* en O(n)."""
-        self._data = list(array)
-        for i in range(len(self._data) // 2 - 1, -1, -1):
+    def build_min_heap(self, items: list) -> None:
+        """Construye el heap a partir de las tuplas de *items* en O(n)."""
+        self._scores = array("d", [score for score, _ in items])
+        self._ids = [item_id for _, item_id in items]
+        for i in range((len(self._ids) - 2) // self.d, -1, -1):
             self.min_heapify(i)
 
     # ------------------------------------------------------------------ #
@@ -62,44 +108,80 @@ class MinHeap:
     # ------------------------------------------------------------------ #
     def heap_minimum(self):
         """Retorna el elemento mínimo sin extraerlo."""
-        if not self._data:
+        if not self._ids:
             raise IndexError("heap_minimum en heap vacío")
-        return self._data[0]
+        return (self._scores[0], self._ids[0])
 
     def heap_extract_min(self):
         """Extrae y retorna el elemento mínimo."""
-        if not self._data:
+        scores = self._scores
+        ids = self._ids
+        if not ids:
             raise IndexError("heap_extract_min en heap vacío")
-        minimum = self._data[0]
-        self._data[0] = self._data[-1]
-        self._data.pop()
-        if self._data:
+        minimum = (scores[0], ids[0])
+        last_score = scores.pop()
+        last_id = ids.pop()
+        if ids:
+            scores[0] = last_score
+            ids[0] = last_id
             self.min_heapify(0)
         return minimum
 
+    def _sift_up(self, i: int, score: float, item_id) -> None:
+        """Sube el hueco en *i* mientras el padre sea mayor que
+        (*score*, *item_id*), que se escribe una sola vez al final."""
+        scores = self._scores
+        ids = self._ids
+        d = self.d
+        while i > 0:
+            p = (i - 1) // d
+            s = scores[p]
+            if s > score or (s == score and ids[p] > item_id):
+                scores[i] = s
+                ids[i] = ids[p]
+                i = p
+            else:
+                break
+        scores[i] = score
+        ids[i] = item_id
+
     def heap_decrease_key(self, i: int, key) -> None:
         """Disminuye la clave del elemento en posición *i* a *key*.
 
         *key* debe ser menor o igual que la clave actual.
         """
-        if key > self._data[i]:
+        if key > (self._scores[i], self._ids[i]):
             raise ValueError("La nueva clave es mayor que la clave actual")
-        self._data[i] = key
-        while i > 0 and self._data[self.parent(i)] > self._data[i]:
-            p = self.parent(i)
-            self._data[i], self._data[p] = self._data[p], self._data[i]
-            i = p
+        self._sift_up(i, *key)
 
     def min_heap_insert(self, key) -> None:
-        """Inserta *key* en el heap usando un sentinel (inf, '')."""
-        self._data.append((float("inf"), ""))
-        self.heap_decrease_key(len(self._data) - 1, key)
+        """Inserta *key* en el heap.
+
+        Abre un hueco al final del arreglo y lo sube mientras el padre
+        sea mayor que *key*, que se escribe una sola vez al final (el
+        ``_siftdown`` de ``heapq``).  Equivale a insertar un sentinel
+        (inf, '') y llamar a ``heap_decrease_key``, sin el sentinel ni
+        la comparación redundante con él.
+        """
+        score, item_id = key
+        self._scores.append(score)
+        self._ids.append(item_id)
+        self._sift_up(len(self._ids) - 1, score, item_id)
+
+    def to_sorted_list(self, reverse: bool = False) -> list:
+        """Retorna las tuplas (score, item_id) ordenadas, sin vaciar el heap.
+
+        Un solo ``sorted`` en C en lugar de extraer el mínimo n veces
+        (n sift-downs en Python); con ``reverse=True`` queda el Top-K de
+        mayor a menor.
+        """
+        return sorted(zip(self._scores, self._ids), reverse=reverse)
 
     # ------------------------------------------------------------------ #
     # Dunder helpers                                                       #
     # ------------------------------------------------------------------ #
     def __len__(self) -> int:
-        return len(self._data)
+        return len(self._ids)
 
     def __repr__(self) -> str:
-        return f"MinHeap({self._data})"
+        return f"MinHeap(d={self.d}, {list(zip(self._scores, self._ids))})"
@@ -0,0 +1,338 @@
+"""
+Lectura y agregación de reviews Amazon por parent_asin.
+
+Fase común a SistemaRec1 y SistemaRecNaive: lee el JSONL de una
+categoría y acumula la suma de ratings y la cantidad de reviews por
+producto.
+
+El resultado se guarda en formato SoA (structure of arrays): una lista
+de ASINs y dos arreglos tipados paralelos (``array('d')`` para las
+sumas, ``array('q')`` para los conteos) en lugar de una lista
+``[sum, count]`` por producto.  Cada producto ocupa 16 bytes contiguos
+en vez de una lista con dos números empaquetados como objetos Python.
+
+Motores disponibles:
+
+- ``"arrow"``: lector JSON columnar de pyarrow con un esquema de solo
+  dos columnas (``parent_asin``, ``rating``) y ``group_by`` en C++.  El
+  resto de campos de cada review (``text``, ``title``, ...) se ignora
+  durante el parseo y la agregación no pasa por el intérprete.
+- ``"python"``: lectura línea por línea en modo binario (buffer de
+  1 MiB, sin decodificar el texto a ``str``) y un dict.  De
+  cada línea se extraen solo ``parent_asin`` y ``rating`` con dos
+  expresiones regulares sobre los bytes crudos (el motor ``re`` está en
+  C), sin construir el dict de la review.  Si una línea no calza con el
+  patrón se parsea completa con ``orjson`` (o ``ujson``, o ``json`` de
+  la biblioteca estándar, según lo que esté instalado).  Sirve de
+  referencia y de respaldo cuando pyarrow no está instalado.  En
+  archivos grandes el JSONL se divide en tramos alineados a saltos de
+  línea que se agregan en procesos separados y luego se combinan.
+
+``"auto"`` (por defecto) usa ``"arrow"`` si pyarrow está disponible.
+El lector de pyarrow ya usa varios hilos por su cuenta.
+
+Con ``cache=True`` el resultado se guarda junto al JSONL en
+``<archivo>.agg.npz``; mientras el JSONL no se modifique, las lecturas
+siguientes cargan ese archivo en O(#productos) en lugar de recorrer
+todas las reviews.
+"""
+
+import json
+import mmap
+import multiprocessing as mp
+import os
+import re
+import tempfile
+from array import array
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - depende del entorno
+    try:
+        import ujson
+
+        _loads = ujson.loads
+    except ImportError:
+        _loads = json.loads
+
+try:
+    import pyarrow as pa
+    import pyarrow.json as pa_json
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pa_json = None
+
+ENGINES = ("auto", "arrow", "python")
+
+# Tamaño mínimo de cada tramo del motor Python paralelo: por debajo de
+# esto lanzar procesos cuesta más de lo que se gana.
+MIN_SHARD_BYTES = 32 << 20
+
+# Buffer de lectura del motor Python: con el de 8 KiB por defecto, un
+# JSONL de varios GB se lee en cientos de miles de syscalls.
+READ_BUFFER_BYTES = 1 << 20
+
+# Dentro de un string JSON las comillas siempre van escapadas (\"), así
+# que estos patrones no pueden calzar con texto dentro de otro valor
+# (``title``, ``text``, ...), solo con las claves reales.
+_ASIN_RE = re.compile(rb'"parent_asin"\s*:\s*"([^"\\]*)"')
+_RATING_RE = re.compile(rb'"rating"\s*:\s*(-?[0-9][0-9.eE+-]*)')
+
+
+class Agregacion(NamedTuple):
+    """Ratings agregados por producto en formato SoA.
+
+    ``asins[i]`` acumula ``sums[i]`` puntos de rating en ``counts[i]``
+    reviews.
+    """
+
+    asins: list[str]
+    sums: array
+    counts: array
+
+
+# ---------------------------------------------------------------------- #
+# Motor pyarrow                                                           #
+# ---------------------------------------------------------------------- #
+def _aggregate_arrow(filepath: str) -> Agregacion:
+    """Agrega con el lector JSON de pyarrow y ``Table.group_by``."""
+    # pyarrow rechaza un archivo vacío (``Empty JSON file``)
+    if os.path.getsize(filepath) == 0:
+        return Agregacion([], array("d"), array("q"))
+    schema = pa.schema([("parent_asin", pa.string()), ("rating", pa.float64())])
+    table = pa_json.read_json(
+        filepath,
+        parse_options=pa_json.ParseOptions(
+            explicit_schema=schema,
+            unexpected_field_behavior="ignore",
+        ),
+    )
+    grouped = table.group_by("parent_asin").aggregate(
+        [("rating", "sum"), ("rating", "count")]
+    )
+
+    # Las columnas numéricas se copian como bloques de bytes a los
+    # arreglos tipados, sin pasar por un float/int Python por producto.
+    sums = grouped["rating_sum"].to_numpy().astype(np.float64, copy=False)
+    counts = grouped["rating_count"].to_numpy().astype(np.int64, copy=False)
+    return Agregacion(
+        grouped["parent_asin"].to_pylist(),
+        array("d", sums.tobytes()),
+        array("q", counts.tobytes()),
+    )
+
+
+# ---------------------------------------------------------------------- #
+# Motor Python puro                                                       #
+# ---------------------------------------------------------------------- #
+def _aggregate_python(
+    filepath: str, start: int = 0, end: int | None = None
+) -> Agregacion:
+    """Agrega las líneas del rango de bytes [*start*, *end*) escaneando
+    los bytes crudos.
+
+    *start* debe caer al inicio de una línea.  ``index`` asigna a cada
+    ASIN un id entero (su posición en los arreglos), así cada review
+    cuesta una sola búsqueda en el dict.  Las claves son los bytes
+    crudos del ASIN: el ``str`` solo se decodifica la primera vez que
+    aparece cada producto.
+    """
+    if end is None:
+        end = os.path.getsize(filepath)
+    loads = _loads
+    search_asin = _ASIN_RE.search
+    search_rating = _RATING_RE.search
+    index: dict[bytes, int] = {}
+    index_get = index.get
+    asins: list[str] = []
+    sums = array("d")
+    counts = array("q")
+
+    with open(filepath, "rb", buffering=READ_BUFFER_BYTES) as f:
+        f.seek(start)
+        remaining = end - start
+        for line in f:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+
+            m_asin = search_asin(line)
+            m_rating = search_rating(line)
+            if m_asin is not None and m_rating is not None:
+                key = m_asin.group(1)
+                rating = float(m_rating.group(1))
+            else:
+                # El patrón excluye escapes, así que los bytes crudos
+                # coinciden con el UTF-8 del ASIN ya parseado.
+                review = loads(line)
+                key = review["parent_asin"].encode()
+                rating = review["rating"]
+
+            i = index_get(key)
+            if i is None:
+                index[key] = len(asins)
+                asins.append(key.decode())
+                sums.append(rating)
+                counts.append(1)
+            else:
+                sums[i] += rating
+                counts[i] += 1
+
+    return Agregacion(asins, sums, counts)
+
+
+def _shard_bounds(filepath: str, n_shards: int) -> list[tuple[int, int]]:
+    """Divide el archivo en hasta *n_shards* rangos de bytes que empiezan
+    y terminan en un límite de línea."""
+    size = os.path.getsize(filepath)
+    if size == 0 or n_shards <= 1:
+        return [(0, size)]
+
+    bounds = [0]
+    with open(filepath, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for j in range(1, n_shards):
+                pos = mm.find(b"\n", size * j // n_shards)
+                bounds.append(size if pos == -1 else pos + 1)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _merge(partials: list[Agregacion]) -> Agregacion:
+    """Combina agregaciones parciales sumando por ASIN.
+
+    Se recorren en el orden de los tramos, de modo que los ASINs quedan
+    en orden de primera aparición en el archivo, igual que en la versión
+    secuencial.
+    """
+    asins, sums, counts = partials[0]
+    index = {asin: i for i, asin in enumerate(asins)}
+    index_get = index.get
+    for part in partials[1:]:
+        for asin, s, c in zip(*part):
+            i = index_get(asin)
+            if i is None:
+                index[asin] = len(asins)
+                asins.append(asin)
+                sums.append(s)
+                counts.append(c)
+            else:
+                sums[i] += s
+                counts[i] += c
+    return Agregacion(asins, sums, counts)
+
+
+def _aggregate_python_parallel(filepath: str, workers: int) -> Agregacion:
+    """Agrega tramos del archivo en *workers* procesos y los combina."""
+    size = os.path.getsize(filepath)
+    n_shards = max(1, min(workers, size // MIN_SHARD_BYTES))
+    shards = _shard_bounds(filepath, n_shards)
+    if len(shards) == 1:
+        return _aggregate_python(filepath)
+
+    with mp.Pool(len(shards)) as pool:
+        partials = pool.starmap(
+            _aggregate_python, [(filepath, a, b) for a, b in shards]
+        )
+    return _merge(partials)
+
+
+# ---------------------------------------------------------------------- #
+# Caché en disco                                                          #
+# ---------------------------------------------------------------------- #
+def _cache_path(filepath: str) -> str:
+    return filepath + ".agg.npz"
+
+
+def _load_cache(filepath: str) -> Agregacion | None:
+    """Retorna la agregación cacheada si es más nueva que el JSONL."""
+    cache_path = _cache_path(filepath)
+    if not os.path.exists(cache_path):
+        return None
+    if os.path.getmtime(cache_path) < os.path.getmtime(filepath):
+        return None
+    with np.load(cache_path) as data:
+        return Agregacion(
+            data["asins"].tolist(),
+            array("d", data["sums"].tobytes()),
+            array("q", data["counts"].tobytes()),
+        )
+
+
+def _save_cache(filepath: str, agg: Agregacion) -> None:
+    """Guarda *agg* de forma atómica (archivo temporal + rename).
+
+    La caché es opcional: si el directorio del dataset no admite
+    escritura (solo lectura, compartido, disco lleno) no se guarda nada
+    y el llamador sigue con la agregación en memoria.  El archivo
+    temporal tiene nombre único, así dos procesos que guardan a la vez
+    no pisan el archivo del otro.
+    """
+    cache_path = _cache_path(filepath)
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path) or ".",
+            prefix=os.path.basename(cache_path) + ".",
+            suffix=".tmp",
+        )
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                asins=np.array(agg.asins, dtype=str),
+                sums=np.frombuffer(agg.sums, dtype=np.float64),
+                counts=np.frombuffer(agg.counts, dtype=np.int64),
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------------------- #
+# API pública                                                             #
+# ---------------------------------------------------------------------- #
+def load_and_aggregate(
+    filepath: str,
+    engine: str = "auto",
+    workers: int | None = None,
+    cache: bool = False,
+) -> Agregacion:
+    """Lee el JSONL en *filepath* y agrega ratings por parent_asin.
+
+    *workers* es la cantidad de procesos del motor ``"python"`` (por
+    defecto, uno por CPU).  Con *cache* se reutiliza/guarda el resultado
+    en ``<filepath>.agg.npz`` (si no se puede escribir, se omite).
+    Retorna ``Agregacion(asins, sums, counts)``.
+    """
+    if engine not in ENGINES:
+        raise ValueError(
+            f"Motor desconocido: {engine!r} (opciones: {', '.join(ENGINES)})"
+        )
+    if engine == "auto":
+        engine = "arrow" if pa is not None else "python"
+    if engine == "arrow" and pa is None:
+        raise ImportError("El motor 'arrow' requiere pyarrow")
+
+    if cache:
+        cached = _load_cache(filepath)
+        if cached is not None:
+            return cached
+
+    if engine == "arrow":
+        agg = _aggregate_arrow(filepath)
+    else:
+        agg = _aggregate_python_parallel(filepath, workers or os.cpu_count() or 1)
+
+    if cache:
+        _save_cache(filepath, agg)
+    return agg
@@ -0,0 +1,73 @@
+"""
+Scores por producto:  score = mean_rating * log(1 + N_reviews)
+
+Los scores dependen solo de los datos de la categoría, no de K.  Por
+eso se calculan una vez por archivo (``load_scores``, con caché en
+memoria) y cualquier cantidad de rankings con distintos K reutiliza el
+mismo arreglo.
+"""
+
+import functools
+import os
+from collections.abc import Sequence
+
+import numpy as np
+
+from .agregacion import load_and_aggregate
+
+
+def compute_scores(sums, counts) -> np.ndarray:
+    """Calcula los scores de todos los productos en una sola pasada.
+
+    *sums* y *counts* son los arreglos paralelos de la agregación;
+    ``np.asarray`` los envuelve sin copiar y el ``log1p`` se evalúa en
+    una sola llamada sobre todo el arreglo.
+    """
+    sums = np.asarray(sums, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    return sums / counts * np.log1p(counts)
+
+
+def _sorted_top_k(
+    scores: np.ndarray, asins: Sequence[str], candidate_idx, k: int
+) -> list[tuple[float, str]]:
+    """Ordena los K mejores a partir de *candidate_idx*, índices de K
+    productos con los mayores scores (en cualquier orden, empates
+    resueltos de cualquier forma).
+
+    Incluye todos los empates con el K-ésimo score antes de ordenar por
+    (score, parent_asin) descendente, así el resultado es idéntico a
+    ordenar las n tuplas y tomar las K primeras.
+    """
+    threshold = scores[candidate_idx].min()
+    candidates = np.flatnonzero(scores >= threshold)
+    scored = list(zip(
+        scores[candidates].tolist(),
+        [asins[i] for i in candidates.tolist()],
+    ))
+    scored.sort(reverse=True)
+    return scored[:k]
+
+
+@functools.lru_cache(maxsize=64)
+def _load_scores(
+    filepath: str, mtime: float, cache: bool
+) -> tuple[tuple[str, ...], np.ndarray]:
+    asins, sums, counts = load_and_aggregate(filepath, cache=cache)
+    scores = compute_scores(sums, counts)
+    # El resultado se comparte entre llamadas: ambas mitades quedan
+    # inmutables (tupla de ASINs y arreglo de solo lectura).
+    scores.flags.writeable = False
+    return tuple(asins), scores
+
+
+def load_scores(
+    filepath: str, cache: bool = True
+) -> tuple[tuple[str, ...], np.ndarray]:
+    """Retorna ``(asins, scores)`` del JSONL en *filepath*.
+
+    El resultado queda en caché en memoria mientras el archivo no se
+    modifique (la clave incluye su mtime).  *cache* controla además la
+    caché en disco de la agregación (``<filepath>.agg.npz``).
+    """
+    return _load_scores(filepath, os.path.getmtime(filepath), cache)
@@ -6,13 +6,90 @@ Fórmula de score:  mean_rating * log(1 + N_reviews)
 Usa un MinHeap de tamaño K para obtener los K mejores productos
 en una sola pasada sobre los datos agregados, con complejidad
 O(n log K) donde n es la cantidad de productos únicos.
+
+El heap es una lista manejada con ``heapq`` (implementado en C); la
+clase ``estructuras_datos.heap.MinHeap`` queda como versión didáctica
+del mismo algoritmo.  Si numba está instalado, el mismo heap corre
+compilado sobre dos arreglos float64/int64 (scores e índices), sin
+crear una tupla Python por producto.
 """
 
-import json
+import heapq
 import math
 import os
+from collections.abc import Sequence
+from itertools import islice
+
+import numpy as np
+
+from .agregacion import Agregacion, load_and_aggregate
+from .scores import _sorted_top_k, compute_scores, load_scores
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - depende del entorno
+    njit = None
+
+
+# ---------------------------------------------------------------------- #
+# Heap compilado con numba (opcional)                                     #
+# ---------------------------------------------------------------------- #
+if njit is not None:
+
+    @njit(cache=True)
+    def _sift_down(heap, idx, i, n):  # pragma: no cover - código compilado
+        """MIN-HEAPIFY con la técnica del hueco sobre (heap, idx)."""
+        x = heap[i]
+        xi = idx[i]
+        while True:
+            c = 2 * i + 1
+            if c >= n:
+                break
+            if c + 1 < n and heap[c + 1] < heap[c]:
+                c += 1
+            if heap[c] < x:
+                heap[i] = heap[c]
+                idx[i] = idx[c]
+                i = c
+            else:
+                break
+        heap[i] = x
+        idx[i] = xi
+
+    @njit(cache=True)
+    def _heap_top_k_indices(scores, k):  # pragma: no cover - código compilado
+        """Índices de K productos con los mayores scores (sin ordenar)."""
+        heap = scores[:k].copy()
+        idx = np.arange(k)
+        for i in range(k // 2 - 1, -1, -1):
+            _sift_down(heap, idx, i, k)
+        for i in range(k, scores.shape[0]):
+            if scores[i] > heap[0]:
+                heap[0] = scores[i]
+                idx[0] = i
+                _sift_down(heap, idx, 0, k)
+        return idx
 
-from estructuras_datos.heap import MinHeap
+else:  # pragma: no cover - depende del entorno
+    _heap_top_k_indices = None
+
+
+def warm_up() -> None:
+    """Compila (o carga de la caché de numba) el heap compilado.
+
+    La primera llamada a una función ``@njit`` incluye su compilación;
+    llamar a ``warm_up`` antes de medir evita cargarla al primer K de un
+    benchmark o a la primera llamada de ``top_k``.  Sin numba no hace
+    nada.
+    """
+    if _heap_top_k_indices is not None:
+        # Mismas firmas que en ``_top_k_from_jit``: float64 contiguo e
+        # int, con arreglo escribible (``compute_scores``) y de solo
+        # lectura (``load_scores``); numba compila una versión por cada.
+        scores = np.zeros(2)
+        _heap_top_k_indices(scores, 1)
+        scores.flags.writeable = False
+        _heap_top_k_indices(scores, 1)
 
 
 class SistemaRec1:
@@ -23,10 +100,13 @@ class SistemaRec1:
         category: str = "Electronics",
         k: int = 10,
         data_dir: str = "dataset/amazon_reviews",
+        cache: bool = True,
     ):
         self.category = category
         self.k = k
         self.data_dir = data_dir
+        # Guardar/reutilizar la agregación en <categoría>.jsonl.agg.npz
+        self.cache = cache
 
     # ------------------------------------------------------------------ #
     # Ruta al archivo JSONL                                               #
@@ -40,9 +120,8 @@ class SistemaRec1:
     # ------------------------------------------------------------------ #
     # Lectura y agregación                                                #
     # ------------------------------------------------------------------ #
-    def _load_and_aggregate(self) -> dict:
-        """Lee el JSONL y agrega ratings por parent_asin.
-        """
+    def _require_filepath(self) -> str:
+        """Retorna la ruta al JSONL o lanza FileNotFoundError si no existe."""
         filepath = self._get_filepath()
         if not os.path.exists(filepath):
             raise FileNotFoundError(
@@ -50,20 +129,22 @@ class SistemaRec1:
                 f"Ejecuta descargar_dataset_amazon_reviews.py "
                 f"--categorias {self.category} --solo-reviews"
             )
+        return filepath
+
+    def _load_and_aggregate(self) -> Agregacion:
+        """Lee el JSONL y agrega ratings por parent_asin.
 
-        aggregated: dict[str, list] = {}
-        with open(filepath, "r", encoding="utf-8") as f:
-            for line in f:
-                review = json.loads(line)
-                parent_asin = review["parent_asin"]
-                rating = review["rating"]
-                if parent_asin in aggregated:
-                    aggregated[parent_asin][0] += rating
-                    aggregated[parent_asin][1] += 1
-                else:
-                    aggregated[parent_asin] = [rating, 1]
+        Retorna ``Agregacion(asins, sums, counts)`` (arreglos paralelos).
+        """
+        return load_and_aggregate(self._require_filepath(), cache=self.cache)
 
-        return aggregated
+    def load_scores(self) -> tuple[tuple[str, ...], np.ndarray]:
+        """Retorna ``(asins, scores)`` de la categoría.
+
+        Los scores no dependen de K: se calculan una vez por archivo y
+        quedan en caché para cualquier ranking posterior.
+        """
+        return load_scores(self._require_filepath(), cache=self.cache)
 
     # ------------------------------------------------------------------ #
     # Fórmula de score                                                    #
@@ -72,39 +153,97 @@ class SistemaRec1:
     def compute_score(sum_ratings: float, count: int) -> float:
         """Calcula score = mean_rating * log(1 + N_reviews)."""
         mean_rating = sum_ratings / count
-        return mean_rating * math.log(1 + count)
+        return mean_rating * math.log1p(count)
+
+    @staticmethod
+    def compute_scores(sums, counts) -> np.ndarray:
+        """Versión vectorizada de ``compute_score`` para todos los productos."""
+        return compute_scores(sums, counts)
 
     # ------------------------------------------------------------------ #
     # Top-K con MinHeap                                                   #
     # ------------------------------------------------------------------ #
-    def top_k(self) -> list[tuple[float, str]]:
+    def top_k(
+        self, aggregated: Agregacion | None = None
+    ) -> list[tuple[float, str]]:
         """Retorna los K productos con mayor score en orden descendente.
 
+        Si se pasa *aggregated* se usa esa agregación en lugar de leer
+        el JSONL (permite compartir una sola lectura entre sistemas).
+        """
+        if aggregated is not None:
+            return self.top_k_from_aggregated(aggregated, self.k)
+        asins, scores = self.load_scores()
+        return self.top_k_from(scores, asins, self.k)
+
+    @classmethod
+    def top_k_from_aggregated(
+        cls, aggregated: Agregacion, k: int
+    ) -> list[tuple[float, str]]:
+        """Top-K a partir de una agregación ya leída (no la modifica)."""
+        asins, sums, counts = aggregated
+        return cls.top_k_from(cls.compute_scores(sums, counts), asins, k)
+
+    @staticmethod
+    def top_k_from(
+        scores, asins: Sequence[str], k: int
+    ) -> list[tuple[float, str]]:
+        """Top-K con MinHeap sobre scores ya calculados.
+
         Algoritmo:
-        - Mantiene un MinHeap de tamaño K.
-        - Para cada producto:
-          - Si el heap tiene menos de K elementos: insertar.
-          - Si el score supera al mínimo del heap: extraer mínimo e insertar.
-        - Al final, extraer todos y revertir para orden descendente.
+        - Construye el MinHeap con los primeros K productos en O(K)
+          (``heapify``, equivalente a ``build_min_heap``).
+        - Para cada producto restante: si la tupla (score, parent_asin)
+          supera al mínimo del heap, reemplazar el mínimo (``heapreplace``
+          = extraer + insertar en un solo sift-down).  Comparar la tupla
+          completa resuelve los empates de score por parent_asin, igual
+          que un sort completo.
+        - Al final, ordenar los K elementos en orden descendente.
+
+        Con numba el heap recorre los scores en código compilado y solo
+        compara floats; luego se agregan los empates con el K-ésimo
+        score y se ordenan por (score, parent_asin), así el resultado es
+        el mismo que con ``heapq``.
         """
-        aggregated = self._load_and_aggregate()
-        heap = MinHeap()
+        if _heap_top_k_indices is not None:
+            return SistemaRec1._top_k_from_jit(scores, asins, k)
 
-        for parent_asin, (sum_ratings, count) in aggregated.items():
-            score = self.compute_score(sum_ratings, count)
+        products = zip(np.asarray(scores).tolist(), asins)
 
-            if len(heap) < self.k:
-                heap.min_heap_insert((score, parent_asin))
-            elif score > heap.heap_minimum()[0]:
-                heap.heap_extract_min()
-                heap.min_heap_insert((score, parent_asin))
+        heap = list(islice(products, k))
+        heapq.heapify(heap)
 
-        # Extraer todos en orden ascendente, luego invertir
-        result = []
-        while len(heap) > 0:
-            result.append(heap.heap_extract_min())
-        result.reverse()
-        return result
+        if heap:
+            # Nombres locales: el bucle recorre todos los productos y así
+            # evita buscar ``heapq.heapreplace`` y leer ``heap[0]`` en cada
+            # iteración (el mínimo solo cambia tras un reemplazo).  Casi
+            # todos los candidatos se descartan con la comparación de
+            # floats; la de tuplas solo se evalúa si el score empata o
+            # supera al mínimo.
+            replace = heapq.heapreplace
+            threshold = heap[0]
+            min_score = threshold[0]
+            for item in products:
+                if item[0] >= min_score and item > threshold:
+                    replace(heap, item)
+                    threshold = heap[0]
+                    min_score = threshold[0]
+
+        # Ordenar solo los K elementos del heap: O(K log K)
+        return sorted(heap, reverse=True)
+
+    @staticmethod
+    def _top_k_from_jit(
+        scores, asins: Sequence[str], k: int
+    ) -> list[tuple[float, str]]:
+        """``top_k_from`` con el heap compilado de ``_heap_top_k_indices``."""
+        scores = np.ascontiguousarray(scores, dtype=np.float64)
+        k = min(k, len(asins))
+        if k <= 0:
+            return []
+
+        top_idx = _heap_top_k_indices(scores, k)
+        return _sorted_top_k(scores, asins, top_idx, k)
 
     # ------------------------------------------------------------------ #
     # Ejecutar e imprimir                                                 #
@@ -117,8 +256,12 @@ class SistemaRec1:
 
         results = self.top_k()
 
-        for rank, (score, parent_asin) in enumerate(results, 1):
-            print(f"  {rank:>3}. {parent_asin}  score={score:.4f}")
-
-        print(f"\nTotal: {len(results)} productos")
+        # Una sola escritura para todo el ranking en lugar de un print
+        # por producto.
+        lines = [
+            f"  {rank:>3}. {parent_asin}  score={score:.4f}"
+            for rank, (score, parent_asin) in enumerate(results, 1)
+        ]
+        lines.append(f"\nTotal: {len(results)} productos")
+        print("\n".join(lines))
         return results
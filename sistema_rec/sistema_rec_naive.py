@@ -1,28 +1,37 @@
 """
 SistemaRecNaive — Top-K ranking naive de productos Amazon.
 Fórmula de score:  mean_rating * log(1 + N_reviews)
-Ordena TODOS los productos por score usando sorted() en O(n log n)
-y luego toma los primeros K.  Esto es peor que SistemaRec1 que usa
-un MinHeap de tamaño K en O(n log K).
+Calcula el score de TODOS los productos en un arreglo NumPy y
+selecciona los K mayores con np.argpartition (introselect, O(n) en
+C); luego ordena solo esos K.  Es la referencia de barrido completo
+contra la que se compara SistemaRec1 (MinHeap de tamaño K, O(n log K)).
 """
 
-import json
 import math
 import os
+from collections.abc import Sequence
+
+import numpy as np
+
+from .agregacion import Agregacion, load_and_aggregate
+from .scores import _sorted_top_k, compute_scores, load_scores
 
 
 class SistemaRecNaive:
-    """Sistema de recomendación Top-K naive — sort completo O(n log n)."""
+    """Sistema de recomendación Top-K naive — barrido completo + argpartition."""
 
     def __init__(
         self,
         category: str = "Electronics",
         k: int = 10,
         data_dir: str = "dataset/amazon_reviews",
+        cache: bool = True,
     ):
         self.category = category
         self.k = k
         self.data_dir = data_dir
+        # Guardar/reutilizar la agregación en <categoría>.jsonl.agg.npz
+        self.cache = cache
 
     # ------------------------------------------------------------------ #
     # Ruta al archivo JSONL                                               #
@@ -36,11 +45,8 @@ class SistemaRecNaive:
     # ------------------------------------------------------------------ #
     # Lectura y agregación                                                #
     # ------------------------------------------------------------------ #
-    def _load_and_aggregate(self) -> dict:
-        """Lee el JSONL línea por línea y agrega ratings por parent_asin.
-
-        Retorna dict[parent_asin] -> [sum_ratings, count].
-        """
+    def _require_filepath(self) -> str:
+        """Retorna la ruta al JSONL o lanza FileNotFoundError si no existe."""
         filepath = self._get_filepath()
         if not os.path.exists(filepath):
             raise FileNotFoundError(
@@ -48,20 +54,22 @@ class SistemaRecNaive:
                 f"Ejecuta descargar_dataset_amazon_reviews.py "
                 f"--categorias {self.category} --solo-reviews"
             )
+        return filepath
+
+    def _load_and_aggregate(self) -> Agregacion:
+        """Lee el JSONL y agrega ratings por parent_asin.
 
-        aggregated: dict[str, list] = {}
-        with open(filepath, "r", encoding="utf-8") as f:
-            for line in f:
-                review = json.loads(line)
-                parent_asin = review["parent_asin"]
-                rating = review["rating"]
-                if parent_asin in aggregated:
-                    aggregated[parent_asin][0] += rating
-                    aggregated[parent_asin][1] += 1
-                else:
-                    aggregated[parent_asin] = [rating, 1]
+        Retorna ``Agregacion(asins, sums, counts)`` (arreglos paralelos).
+        """
+        return load_and_aggregate(self._require_filepath(), cache=self.cache)
+
+    def load_scores(self) -> tuple[tuple[str, ...], np.ndarray]:
+        """Retorna ``(asins, scores)`` de la categoría.
 
-        return aggregated
+        Los scores no dependen de K: se calculan una vez por archivo y
+        quedan en caché para cualquier ranking posterior.
+        """
+        return load_scores(self._require_filepath(), cache=self.cache)
 
     # ------------------------------------------------------------------ #
     # Fórmula de score                                                    #
@@ -70,30 +78,62 @@ class SistemaRecNaive:
     def compute_score(sum_ratings: float, count: int) -> float:
         """Calcula score = mean_rating * log(1 + N_reviews)."""
         mean_rating = sum_ratings / count
-        return mean_rating * math.log(1 + count)
+        return mean_rating * math.log1p(count)
+
+    @staticmethod
+    def compute_scores(sums, counts) -> np.ndarray:
+        """Versión vectorizada de ``compute_score`` para todos los productos."""
+        return compute_scores(sums, counts)
 
     # ------------------------------------------------------------------ #
-    # Top-K naive: sort completo O(n log n)                               #
+    # Top-K naive: barrido completo + selección con argpartition          #
     # ------------------------------------------------------------------ #
-    def top_k(self) -> list[tuple[float, str]]:
+    def top_k(
+        self, aggregated: Agregacion | None = None
+    ) -> list[tuple[float, str]]:
         """Retorna los K productos con mayor score en orden descendente.
 
-        Algoritmo naive:
-        1. Calcula scores para TODOS los n productos.
-        2. Ordena los n productos por score descendente — O(n log n).
-        3. Retorna los primeros K.
+        Si se pasa *aggregated* se usa esa agregación en lugar de leer
+        el JSONL (permite compartir una sola lectura entre sistemas).
         """
-        aggregated = self._load_and_aggregate()
+        if aggregated is not None:
+            return self.top_k_from_aggregated(aggregated, self.k)
+        asins, scores = self.load_scores()
+        return self.top_k_from(scores, asins, self.k)
+
+    @classmethod
+    def top_k_from_aggregated(
+        cls, aggregated: Agregacion, k: int
+    ) -> list[tuple[float, str]]:
+        """Top-K a partir de una agregación ya leída (no la modifica)."""
+        asins, sums, counts = aggregated
+        return cls.top_k_from(cls.compute_scores(sums, counts), asins, k)
 
-        scored = [
-            (self.compute_score(sum_r, count), parent_asin)
-            for parent_asin, (sum_r, count) in aggregated.items()
-        ]
+    @staticmethod
+    def top_k_from(
+        scores, asins: Sequence[str], k: int
+    ) -> list[tuple[float, str]]:
+        """Top-K naive sobre scores ya calculados.
 
-        # O(n log n) — ordena TODOS los productos
-        scored.sort(reverse=True)
+        Algoritmo naive:
+        1. Recibe los scores de TODOS los n productos.
+        2. Selecciona los K mayores con ``np.argpartition`` — O(n).
+        3. Ordena solo esos K por (score, parent_asin) descendente.
 
-        return scored[: self.k]
+        El resultado es idéntico a ordenar las n tuplas (score, asin) y
+        tomar las K primeras: los empates en el K-ésimo score se
+        resuelven por parent_asin igual que en el sort completo.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        k = min(k, len(asins))
+        if k <= 0:
+            return []
+
+        # O(n) — los K mayores quedan en las primeras K posiciones
+        top_idx = np.argpartition(-scores, k - 1)[:k]
+
+        # Empates con el K-ésimo score y orden final de los K
+        return _sorted_top_k(scores, asins, top_idx, k)
 
     # ------------------------------------------------------------------ #
     # Ejecutar e imprimir                                                 #
@@ -101,12 +141,16 @@ class SistemaRecNaive:
     def run(self) -> list[tuple[float, str]]:
         """Ejecuta el ranking e imprime los resultados."""
         print(f"Categoría: {self.category}")
-        print(f"Top-{self.k} productos (naive sort O(n log n)):\n")
+        print(f"Top-{self.k} productos (naive argpartition O(n)):\n")
 
         results = self.top_k()
 
-        for rank, (score, parent_asin) in enumerate(results, 1):
-            print(f"  {rank:>3}. {parent_asin}  score={score:.4f}")
-
-        print(f"\nTotal: {len(results)} productos")
+        # Una sola escritura para todo el ranking en lugar de un print
+        # por producto.
+        lines = [
+            f"  {rank:>3}. {parent_asin}  score={score:.4f}"
+            for rank, (score, parent_asin) in enumerate(results, 1)
+        ]
+        lines.append(f"\nTotal: {len(results)} productos")
+        print("\n".join(lines))
         return results
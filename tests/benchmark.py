@@ -1,5 +1,5 @@
 """
-Benchmark: SistemaRec1 (MinHeap O(n log K)) vs SistemaRecNaive (sort O(n log n)).
+Benchmark: SistemaRec1 (MinHeap O(n log K)) vs SistemaRecNaive (argpartition O(n)).
 
 Compara ambos sistemas sobre todas las categorías de Amazon < 2 GB,
 calcula métricas de sistemas de recomendación y genera un reporte CSV.
@@ -7,6 +7,7 @@ calcula métricas de sistemas de recomendación y genera un reporte CSV.
 Uso:
     python tests/benchmark.py
     python tests/benchmark.py --top-k 20
+    python tests/benchmark.py --top-k 10 100 1000
     python tests/benchmark.py --output resultados.csv
 """
 
@@ -16,10 +17,13 @@ import math
 import os
 import sys
 import time
+from dataclasses import dataclass
+from operator import itemgetter
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sistema_rec.sistema_rec1 import SistemaRec1
+from sistema_rec.scores import compute_scores
+from sistema_rec.sistema_rec1 import SistemaRec1, warm_up
 from sistema_rec.sistema_rec_naive import SistemaRecNaive
 
 # Categorías cuyo archivo JSONL de reviews pesa menos de 2 GB
@@ -46,6 +50,7 @@ DATA_DIR = os.path.join(
 CSV_COLUMNS = [
     "category",
     "k",
+    "time_io_s",
     "time_rec1_s",
     "time_naive_s",
     "speedup",
@@ -61,20 +66,42 @@ CSV_COLUMNS = [
 # Métricas de sistemas de recomendación                                   #
 # ====================================================================== #
 
-def precision_at_k(ref: list, evl: list) -> float:
+@dataclass(frozen=True)
+class RankingView:
+    """Vistas precalculadas de un ranking ``[(score, item_id), ...]``.
+
+    Se construye una vez por ranking y la comparten todas las métricas,
+    en lugar de que cada una reconstruya sus propios sets y dicts.
+    """
+
+    ids: list[str]
+    id_set: set[str]
+    score: dict[str, float]
+    rank: dict[str, int]
+
+    @classmethod
+    def from_ranking(cls, ranking: list[tuple[float, str]]) -> "RankingView":
+        ids = list(map(itemgetter(1), ranking))
+        return cls(
+            ids=ids,
+            id_set=set(ids),
+            score=dict(zip(ids, map(itemgetter(0), ranking))),
+            rank={item_id: i for i, item_id in enumerate(ids)},
+        )
+
+
+def precision_at_k(ref: RankingView, evl: RankingView) -> float:
     """Precision@K: fracción de items en *evl* presentes en *ref*.
 
     Mide qué proporción de los K items recomendados por el sistema
     evaluado coincide con los del sistema de referencia.
     """
-    set_ref = {item_id for _, item_id in ref}
-    set_evl = {item_id for _, item_id in evl}
-    if not set_evl:
+    if not evl.id_set:
         return 0.0
-    return len(set_ref & set_evl) / len(set_evl)
+    return len(ref.id_set & evl.id_set) / len(evl.id_set)
 
 
-def average_precision_at_k(ref: list, evl: list) -> float:
+def average_precision_at_k(ref: RankingView, evl: RankingView) -> float:
     """AP@K (Average Precision at K).
 
     Recorre el ranking evaluado posición por posición; cada vez que
@@ -82,18 +109,18 @@ def average_precision_at_k(ref: list, evl: list) -> float:
     en esa posición.  Penaliza rankings donde los items relevantes
     aparecen en posiciones bajas.
     """
-    set_ref = {item_id for _, item_id in ref}
+    set_ref = ref.id_set
     if not set_ref:
         return 0.0
 
     hits = 0
     sum_precision = 0.0
-    for i, (_, item_id) in enumerate(evl, 1):
+    for i, item_id in enumerate(evl.ids, 1):
         if item_id in set_ref:
             hits += 1
             sum_precision += hits / i
 
-    return sum_precision / min(len(ref), len(evl)) if evl else 0.0
+    return sum_precision / min(len(ref.ids), len(evl.ids)) if evl.ids else 0.0
 
 
 def _dcg(gains: list[float]) -> float:
@@ -101,16 +128,16 @@ def _dcg(gains: list[float]) -> float:
     return sum(g / math.log2(i + 2) for i, g in enumerate(gains))
 
 
-def ndcg_at_k(ref: list, evl: list) -> float:
+def ndcg_at_k(ref: RankingView, evl: RankingView) -> float:
     """NDCG@K (Normalized Discounted Cumulative Gain).
 
     Usa los scores del ranking de referencia como relevancias ideales.
     Mide qué tan bien el ranking evaluado preserva el orden óptimo,
     penalizando items relevantes que aparecen en posiciones tardías.
     """
-    relevance = {item_id: score for score, item_id in ref}
+    relevance = ref.score
 
-    eval_gains = [relevance.get(item_id, 0.0) for _, item_id in evl]
+    eval_gains = [relevance.get(item_id, 0.0) for item_id in evl.ids]
     actual_dcg = _dcg(eval_gains)
 
     ideal_gains = sorted(relevance.values(), reverse=True)
@@ -121,30 +148,28 @@ def ndcg_at_k(ref: list, evl: list) -> float:
     return actual_dcg / ideal_dcg
 
 
-def jaccard_at_k(ranking_a: list, ranking_b: list) -> float:
+def jaccard_at_k(ranking_a: RankingView, ranking_b: RankingView) -> float:
     """Jaccard@K: similaridad de conjuntos entre dos top-K.
 
     |A ∩ B| / |A ∪ B|.  Mide el solapamiento global de los items
     recomendados sin considerar el orden.
     """
-    set_a = {item_id for _, item_id in ranking_a}
-    set_b = {item_id for _, item_id in ranking_b}
-    union = set_a | set_b
+    union = ranking_a.id_set | ranking_b.id_set
     if not union:
         return 0.0
-    return len(set_a & set_b) / len(union)
+    return len(ranking_a.id_set & ranking_b.id_set) / len(union)
 
 
-def spearman_rho(ranking_a: list, ranking_b: list) -> float:
+def spearman_rho(ranking_a: RankingView, ranking_b: RankingView) -> float:
     """Correlación de Spearman entre los rankings de items comunes.
 
     Mide qué tan similar es el *orden* de los items que ambos sistemas
     tienen en común.  ρ = 1 indica orden idéntico, ρ = 0 sin correlación.
     """
-    rank_a = {item_id: i for i, (_, item_id) in enumerate(ranking_a)}
-    rank_b = {item_id: i for i, (_, item_id) in enumerate(ranking_b)}
+    rank_a = ranking_a.rank
+    rank_b = ranking_b.rank
 
-    common = set(rank_a) & set(rank_b)
+    common = ranking_a.id_set & ranking_b.id_set
     n = len(common)
     if n < 2:
         return float("nan")
@@ -157,10 +182,17 @@ def spearman_rho(ranking_a: list, ranking_b: list) -> float:
 # Benchmark runner                                                        #
 # ====================================================================== #
 
-def benchmark_category(category: str, k: int) -> dict | None:
-    """Ejecuta ambos sistemas sobre una categoría y retorna métricas."""
-    rec1 = SistemaRec1(category=category, k=k, data_dir=DATA_DIR)
-    naive = SistemaRecNaive(category=category, k=k, data_dir=DATA_DIR)
+def benchmark_category(category: str, ks: list[int]) -> list[dict] | None:
+    """Ejecuta ambos sistemas sobre una categoría para cada K y retorna
+    una fila de métricas por K.
+
+    El JSONL se lee y agrega una sola vez por categoría (con caché en
+    disco) y ambos sistemas parten de la misma agregación; ese tiempo
+    se reporta aparte en ``time_io_s``.  Los scores tampoco dependen de
+    K, así que solo la selección Top-K se repite para cada K y los
+    tiempos de cada sistema comparan únicamente la fase de ranking.
+    """
+    rec1 = SistemaRec1(category=category, data_dir=DATA_DIR)
 
     # Verificar que el archivo exista
     filepath = rec1._get_filepath()
@@ -168,62 +200,86 @@ def benchmark_category(category: str, k: int) -> dict | None:
         print(f"  [SKIP] Archivo no encontrado: {filepath}")
         return None
 
-    # --- SistemaRec1 (MinHeap) ---
+    # --- Lectura y agregación: una sola vez, compartida por ambos sistemas ---
     t0 = time.perf_counter()
-    results_rec1 = rec1.top_k()
-    time_rec1 = time.perf_counter() - t0
+    asins, sums, counts = rec1._load_and_aggregate()
+    time_io = time.perf_counter() - t0
 
-    # --- SistemaRecNaive (sort) ---
-    t0 = time.perf_counter()
-    results_naive = naive.top_k()
-    time_naive = time.perf_counter() - t0
-
-    speedup = time_naive / time_rec1 if time_rec1 > 0 else float("inf")
-
-    # --- Métricas (ref = naive como ground-truth con sort determinista) ---
-    prec = precision_at_k(results_naive, results_rec1)
-    ap = average_precision_at_k(results_naive, results_rec1)
-    ndcg = ndcg_at_k(results_naive, results_rec1)
-    jacc = jaccard_at_k(results_rec1, results_naive)
-    rho = spearman_rho(results_naive, results_rec1)
-
-    return {
-        "category": category,
-        "k": k,
-        "time_rec1_s": round(time_rec1, 4),
-        "time_naive_s": round(time_naive, 4),
-        "speedup": round(speedup, 4),
-        "precision_at_k": round(prec, 4),
-        "ap_at_k": round(ap, 4),
-        "ndcg_at_k": round(ndcg, 4),
-        "jaccard_at_k": round(jacc, 4),
-        "spearman_rho": round(rho, 4) if not math.isnan(rho) else "NaN",
-    }
-
-
-def run_benchmark(categories: list[str], k: int, output_path: str) -> None:
+    # --- Scores: no dependen de K ---
+    scores = compute_scores(sums, counts)
+
+    warm_up()
+
+    rows = []
+    for k in ks:
+        # --- SistemaRec1 (MinHeap) ---
+        t0 = time.perf_counter()
+        results_rec1 = SistemaRec1.top_k_from(scores, asins, k)
+        time_rec1 = time.perf_counter() - t0
+
+        # --- SistemaRecNaive (argpartition) ---
+        t0 = time.perf_counter()
+        results_naive = SistemaRecNaive.top_k_from(scores, asins, k)
+        time_naive = time.perf_counter() - t0
+
+        speedup = time_naive / time_rec1 if time_rec1 > 0 else float("inf")
+
+        # --- Métricas (ref = naive como ground-truth con orden determinista) ---
+        ref = RankingView.from_ranking(results_naive)
+        evl = RankingView.from_ranking(results_rec1)
+        prec = precision_at_k(ref, evl)
+        ap = average_precision_at_k(ref, evl)
+        ndcg = ndcg_at_k(ref, evl)
+        jacc = jaccard_at_k(evl, ref)
+        rho = spearman_rho(ref, evl)
+
+        rows.append({
+            "category": category,
+            "k": k,
+            "time_io_s": round(time_io, 4),
+            "time_rec1_s": round(time_rec1, 4),
+            "time_naive_s": round(time_naive, 4),
+            "speedup": round(speedup, 4),
+            "precision_at_k": round(prec, 4),
+            "ap_at_k": round(ap, 4),
+            "ndcg_at_k": round(ndcg, 4),
+            "jaccard_at_k": round(jacc, 4),
+            "spearman_rho": round(rho, 4) if not math.isnan(rho) else "NaN",
+        })
+    return rows
+
+
+def run_benchmark(categories: list[str], ks: list[int], output_path: str) -> None:
     """Ejecuta el benchmark completo y genera el CSV."""
     rows = []
 
-    print(f"Benchmark: SistemaRec1 vs SistemaRecNaive  (K={k})")
+    print(f"Benchmark: SistemaRec1 vs SistemaRecNaive  "
+          f"(K={', '.join(map(str, ks))})")
     print(f"Categorías: {len(categories)}")
     print(f"Output: {output_path}")
     print("=" * 70)
 
     for i, category in enumerate(categories, 1):
         print(f"\n[{i}/{len(categories)}] {category} ...", flush=True)
-        row = benchmark_category(category, k)
-        if row is None:
+        category_rows = benchmark_category(category, ks)
+        if category_rows is None:
             continue
-        rows.append(row)
-        print(f"  Rec1: {row['time_rec1_s']}s | "
-              f"Naive: {row['time_naive_s']}s | "
-              f"Speedup: {row['speedup']}x")
-        print(f"  Precision@K={row['precision_at_k']}  "
-              f"AP@K={row['ap_at_k']}  "
-              f"NDCG@K={row['ndcg_at_k']}  "
-              f"Jaccard={row['jaccard_at_k']}  "
-              f"Spearman={row['spearman_rho']}")
+        rows.extend(category_rows)
+
+        # Un solo write por categoría en lugar de dos prints por K
+        lines = []
+        for row in category_rows:
+            lines.append(f"  K={row['k']}  "
+                         f"I/O: {row['time_io_s']}s | "
+                         f"Rec1: {row['time_rec1_s']}s | "
+                         f"Naive: {row['time_naive_s']}s | "
+                         f"Speedup: {row['speedup']}x")
+            lines.append(f"  Precision@K={row['precision_at_k']}  "
+                         f"AP@K={row['ap_at_k']}  "
+                         f"NDCG@K={row['ndcg_at_k']}  "
+                         f"Jaccard={row['jaccard_at_k']}  "
+                         f"Spearman={row['spearman_rho']}")
+        sys.stdout.write("\n".join(lines) + "\n")
 
     # Escribir CSV
     if rows:
@@ -249,8 +305,10 @@ def main():
     parser.add_argument(
         "--top-k",
         type=int,
-        default=10,
-        help="Cantidad de productos en el ranking (default: 10)",
+        nargs="+",
+        default=[10],
+        help="Cantidad(es) de productos en el ranking; con varios valores "
+             "los scores se calculan una vez por categoría (default: 10)",
     )
     parser.add_argument(
         "--output",
@@ -0,0 +1,139 @@
+"""Tests para la fase de lectura y agregación (no requieren dataset)."""
+
+import json
+import os
+from array import array
+
+import pytest
+
+from sistema_rec import agregacion
+from sistema_rec.agregacion import load_and_aggregate
+from sistema_rec.scores import compute_scores, load_scores
+
+REVIEWS = [
+    {"rating": 5.0, "title": "Genial", "text": "Muy \"bueno\"", "parent_asin": "A1"},
+    {"rating": 3.0, "title": "Normal", "text": "ñandú", "parent_asin": "B2"},
+    {"rating": 4.0, "title": "Bien", "text": "", "parent_asin": "A1"},
+    {"rating": 1.0, "title": "Malo", "text": "x" * 500, "parent_asin": "C3"},
+    {"rating": 2.0, "title": "Meh", "text": "parent_asin", "parent_asin": "B2"},
+]
+
+EXPECTED = {"A1": (9.0, 2), "B2": (5.0, 2), "C3": (1.0, 1)}
+
+
+def as_dict(agg) -> dict:
+    """Convierte una Agregacion SoA a dict[asin] -> (sum, count)."""
+    return dict(zip(agg.asins, zip(agg.sums, agg.counts)))
+
+
+@pytest.fixture()
+def jsonl_path(tmp_path):
+    path = tmp_path / "Mini.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for review in REVIEWS:
+            f.write(json.dumps(review, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+class TestLoadAndAggregate:
+
+    def test_python_engine(self, jsonl_path):
+        assert as_dict(load_and_aggregate(jsonl_path, engine="python")) == EXPECTED
+
+    def test_arrow_engine(self, jsonl_path):
+        pytest.importorskip("pyarrow")
+        assert as_dict(load_and_aggregate(jsonl_path, engine="arrow")) == EXPECTED
+
+    def test_auto_engine(self, jsonl_path):
+        assert as_dict(load_and_aggregate(jsonl_path)) == EXPECTED
+
+    @pytest.mark.parametrize("engine", ["python", "arrow"])
+    def test_empty_file(self, tmp_path, engine):
+        if engine == "arrow":
+            pytest.importorskip("pyarrow")
+        path = tmp_path / "Empty.jsonl"
+        path.touch()
+        agg = load_and_aggregate(str(path), engine=engine)
+        assert agg == ([], array("d"), array("q"))
+
+    def test_python_engine_fallback_to_full_parse(self, tmp_path):
+        """Líneas que no calzan con el escaneo rápido se parsean completas."""
+        path = tmp_path / "Escapes.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"rating": 4, "parent_asin": "Ñ1"}) + "\n")
+            f.write('{"parent_asin":"Ñ1","rating":2.0}\n')
+        agg = load_and_aggregate(str(path), engine="python")
+        assert as_dict(agg) == {"Ñ1": (6.0, 2)}
+
+    def test_python_engine_parallel(self, jsonl_path, monkeypatch):
+        """Con tramos pequeños el resultado coincide con la versión secuencial."""
+        monkeypatch.setattr(agregacion, "MIN_SHARD_BYTES", 64)
+        assert len(agregacion._shard_bounds(jsonl_path, 3)) > 1
+        agg = load_and_aggregate(jsonl_path, engine="python", workers=3)
+        assert as_dict(agg) == EXPECTED
+        assert agg.asins == ["A1", "B2", "C3"]
+
+    def test_cache_roundtrip(self, jsonl_path):
+        first = load_and_aggregate(jsonl_path, engine="python", cache=True)
+        assert os.path.exists(jsonl_path + ".agg.npz")
+        cached = load_and_aggregate(jsonl_path, engine="python", cache=True)
+        assert cached == first
+        assert cached.sums.typecode == "d"
+        assert cached.counts.typecode == "q"
+
+    def test_cache_invalidated_by_newer_jsonl(self, jsonl_path):
+        load_and_aggregate(jsonl_path, engine="python", cache=True)
+        with open(jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"rating": 5.0, "parent_asin": "D4"}) + "\n")
+        stamp = os.path.getmtime(jsonl_path + ".agg.npz") + 1
+        os.utime(jsonl_path, (stamp, stamp))
+        agg = load_and_aggregate(jsonl_path, engine="python", cache=True)
+        assert as_dict(agg)["D4"] == (5.0, 1)
+
+    def test_cache_save_failure_is_ignored(self, jsonl_path, monkeypatch):
+        """Si no se puede escribir la caché se usa el resultado en memoria."""
+        def fail(*args, **kwargs):
+            raise OSError("solo lectura")
+
+        monkeypatch.setattr(agregacion.np, "savez", fail)
+        agg = load_and_aggregate(jsonl_path, engine="python", cache=True)
+        assert as_dict(agg) == EXPECTED
+        assert os.listdir(os.path.dirname(jsonl_path)) == ["Mini.jsonl"]
+
+    def test_cache_unwritable_directory(self, jsonl_path, monkeypatch):
+        def fail(*args, **kwargs):
+            raise PermissionError("solo lectura")
+
+        monkeypatch.setattr(agregacion.tempfile, "mkstemp", fail)
+        agg = load_and_aggregate(jsonl_path, engine="python", cache=True)
+        assert as_dict(agg) == EXPECTED
+
+    def test_soa_arrays_are_parallel(self, jsonl_path):
+        agg = load_and_aggregate(jsonl_path, engine="python")
+        assert agg.sums.typecode == "d"
+        assert agg.counts.typecode == "q"
+        assert len(agg.asins) == len(agg.sums) == len(agg.counts) == 3
+
+    def test_unknown_engine_raises(self, jsonl_path):
+        with pytest.raises(ValueError):
+            load_and_aggregate(jsonl_path, engine="spark")
+
+
+class TestLoadScores:
+
+    def test_scores_match_aggregation(self, jsonl_path):
+        asins, scores = load_scores(jsonl_path)
+        agg = load_and_aggregate(jsonl_path)
+        assert list(asins) == agg.asins
+        assert scores.tolist() == compute_scores(agg.sums, agg.counts).tolist()
+
+    def test_disk_cache_opt_out(self, jsonl_path):
+        load_scores(jsonl_path, cache=False)
+        assert not os.path.exists(jsonl_path + ".agg.npz")
+
+    def test_memoized_and_read_only(self, jsonl_path):
+        first = load_scores(jsonl_path)
+        assert load_scores(jsonl_path) is first
+        with pytest.raises(ValueError):
+            first[1][0] = 0.0
+        assert isinstance(first[0], tuple)
@@ -2,21 +2,26 @@
 
 import math
 import os
+import random
+from array import array
 
+import numpy as np
 import pytest
 
 from estructuras_datos.heap import MinHeap
+from sistema_rec import sistema_rec1
 from sistema_rec.sistema_rec1 import SistemaRec1
 
 
 # ====================================================================== #
 # Tests MinHeap                                                           #
 # ====================================================================== #
+@pytest.mark.parametrize("d", [2, 4])
 class TestMinHeap:
-    """Tests unitarios para MinHeap (no requieren dataset)."""
+    """Tests unitarios para MinHeap binario y 4-ario (no requieren dataset)."""
 
-    def test_insert_and_extract_min(self):
-        h = MinHeap()
+    def test_insert_and_extract_min(self, d):
+        h = MinHeap(d)
         h.min_heap_insert((3, "c"))
         h.min_heap_insert((1, "a"))
         h.min_heap_insert((2, "b"))
@@ -24,9 +29,9 @@ class TestMinHeap:
         assert h.heap_extract_min() == (2, "b")
         assert h.heap_extract_min() == (3, "c")
 
-    def test_extract_min_order(self):
+    def test_extract_min_order(self, d):
         """Extraer todos los elementos debe dar orden ascendente."""
-        h = MinHeap()
+        h = MinHeap(d)
         values = [(5, "e"), (3, "c"), (8, "h"), (1, "a"), (4, "d")]
         for v in values:
             h.min_heap_insert(v)
@@ -38,25 +43,44 @@ class TestMinHeap:
         scores = [s for s, _ in result]
         assert scores == sorted(scores)
 
-    def test_build_min_heap(self):
+    def test_extract_min_order_random(self, d):
+        """Con varios niveles de profundidad el orden sigue siendo ascendente."""
+        rng = random.Random(42)
+        values = [(rng.randint(0, 50), f"id{i}") for i in range(200)]
+        h = MinHeap(d)
+        for v in values:
+            h.min_heap_insert(v)
+
+        result = [h.heap_extract_min() for _ in range(len(values))]
+        assert result == sorted(values)
+
+    def test_to_sorted_list(self, d):
+        values = [(5, "e"), (3, "c"), (8, "h"), (3, "a"), (4, "d")]
+        h = MinHeap(d)
+        h.build_min_heap(values)
+        assert h.to_sorted_list() == sorted(values)
+        assert h.to_sorted_list(reverse=True) == sorted(values, reverse=True)
+        assert len(h) == len(values)
+
+    def test_build_min_heap(self, d):
         data = [(5, "e"), (3, "c"), (8, "h"), (1, "a"), (4, "d")]
-        h = MinHeap()
+        h = MinHeap(d)
         h.build_min_heap(data)
         assert h.heap_minimum() == (1, "a")
         assert len(h) == 5
 
-    def test_extract_min_empty_raises(self):
-        h = MinHeap()
+    def test_extract_min_empty_raises(self, d):
+        h = MinHeap(d)
         with pytest.raises(IndexError):
             h.heap_extract_min()
 
-    def test_minimum_empty_raises(self):
-        h = MinHeap()
+    def test_minimum_empty_raises(self, d):
+        h = MinHeap(d)
         with pytest.raises(IndexError):
             h.heap_minimum()
 
-    def test_decrease_key(self):
-        h = MinHeap()
+    def test_decrease_key(self, d):
+        h = MinHeap(d)
         h.min_heap_insert((10, "x"))
         h.min_heap_insert((20, "y"))
         h.min_heap_insert((30, "z"))
@@ -65,14 +89,14 @@ class TestMinHeap:
         h.heap_decrease_key(0, (5, "x"))
         assert h.heap_minimum() == (5, "x")
 
-    def test_decrease_key_invalid_raises(self):
-        h = MinHeap()
+    def test_decrease_key_invalid_raises(self, d):
+        h = MinHeap(d)
         h.min_heap_insert((10, "x"))
         with pytest.raises(ValueError):
             h.heap_decrease_key(0, (20, "bigger"))
 
-    def test_len(self):
-        h = MinHeap()
+    def test_len(self, d):
+        h = MinHeap(d)
         assert len(h) == 0
         h.min_heap_insert((1, "a"))
         assert len(h) == 1
@@ -81,6 +105,23 @@ class TestMinHeap:
         h.heap_extract_min()
         assert len(h) == 1
 
+    def test_child_indices(self, d):
+        h = MinHeap(d)
+        for i in range(5):
+            children = [h.child(i, j) for j in range(d)]
+            assert children[0] == h.left(i)
+            assert children[-1] == h.right(i)
+            assert all(h.parent(c) == i for c in children)
+
+
+def test_min_heap_invalid_arity():
+    with pytest.raises(ValueError):
+        MinHeap(1)
+
+
+def test_min_heap_has_no_instance_dict():
+    assert not hasattr(MinHeap(), "__dict__")
+
 
 # ====================================================================== #
 # Tests SistemaRec1 — fórmula de score                                   #
@@ -112,17 +153,75 @@ class TestSistemaRec1Score:
         expected = 5.0 * math.log(2)
         assert math.isclose(score, expected, rel_tol=1e-9)
 
+    def test_compute_scores_matches_scalar(self):
+        sums = array("d", [20.0, 5.0, 400.0, 1.0])
+        counts = array("q", [5, 1, 100, 1])
+        scores = SistemaRec1.compute_scores(sums, counts)
+        for score, s, c in zip(scores.tolist(), sums, counts):
+            assert math.isclose(score, SistemaRec1.compute_score(s, c),
+                                rel_tol=1e-12)
+
+
+# ====================================================================== #
+# Tests SistemaRec1 — Top-K                                              #
+# ====================================================================== #
+@pytest.fixture(params=["heapq", "numba"])
+def heap_impl(request, monkeypatch):
+    """Ejecuta el test con el heap de heapq y con el compilado por numba."""
+    if request.param == "heapq":
+        monkeypatch.setattr(sistema_rec1, "_heap_top_k_indices", None)
+    elif sistema_rec1._heap_top_k_indices is None:
+        pytest.skip("numba no está instalado")
+    return request.param
+
+
+class TestSistemaRec1TopK:
+    """Top-K sobre scores sintéticos (no requieren dataset)."""
+
+    @pytest.mark.parametrize("k", [1, 10, 150, 300, 400])
+    def test_ties_resolved_like_full_sort(self, heap_impl, k):
+        """Con muchos empates de score el heap coincide con un sort completo."""
+        rng = random.Random(3)
+        scores = [float(rng.randint(1, 5)) for _ in range(300)]
+        asins = [f"P{rng.randint(0, 10**6):07d}" for _ in scores]
+        expected = sorted(zip(scores, asins), reverse=True)[:k]
+        assert SistemaRec1.top_k_from(scores, asins, k) == expected
+
+    def test_k_zero(self, heap_impl):
+        assert SistemaRec1.top_k_from([1.0, 2.0], ["a", "b"], 0) == []
+
+    def test_warm_up(self, heap_impl):
+        sistema_rec1.warm_up()
+        assert SistemaRec1.top_k_from([1.0, 2.0], ["a", "b"], 1) == [(2.0, "b")]
+
+    def test_warm_up_covers_read_only_scores(self, heap_impl):
+        """Los scores de ``load_scores`` (solo lectura) no recompilan."""
+        if heap_impl != "numba":
+            pytest.skip("solo aplica al heap compilado")
+        sistema_rec1.warm_up()
+        kernel = sistema_rec1._heap_top_k_indices
+        n_signatures = len(kernel.signatures)
+        scores = np.array([1.0, 3.0, 2.0])
+        scores.flags.writeable = False
+        assert SistemaRec1.top_k_from(scores, ("a", "b", "c"), 2) == [
+            (3.0, "b"), (2.0, "c")]
+        assert len(kernel.signatures) == n_signatures
+
 
 # ====================================================================== #
 # Tests integración (requieren dataset descargado)                        #
 # ====================================================================== #
 class TestSistemaRec1Integration:
-    """Tests de integración que leen el dataset real."""
+    """Tests de integración que leen el dataset real.
 
-    @pytest.fixture()
-    def sistema(self, request):
-        category = request.config.getoption("--category")
-        top_k = request.config.getoption("--top-k")
+    El sistema y la agregación se crean una sola vez por sesión: el
+    JSONL se lee una vez y todos los tests rankean sobre esa agregación.
+    """
+
+    @pytest.fixture(scope="session")
+    def sistema(self, pytestconfig):
+        category = pytestconfig.getoption("--category")
+        top_k = pytestconfig.getoption("--top-k")
         data_dir = os.path.join(
             os.path.dirname(os.path.dirname(__file__)),
             "dataset",
@@ -130,23 +229,25 @@ class TestSistemaRec1Integration:
         )
         return SistemaRec1(category=category, k=top_k, data_dir=data_dir)
 
-    @pytest.fixture()
-    def dataset_available(self, sistema):
+    @pytest.fixture(scope="session")
+    def aggregated_cache(self, sistema):
         filepath = sistema._get_filepath()
         if not os.path.exists(filepath):
             pytest.skip(f"Dataset no disponible: {filepath}")
+        return sistema._load_and_aggregate()
+
+    @pytest.fixture()
+    def results(self, sistema, aggregated_cache):
+        return sistema.top_k_from_aggregated(aggregated_cache, sistema.k)
 
-    def test_returns_k_results(self, sistema, dataset_available):
-        results = sistema.top_k()
+    def test_returns_k_results(self, sistema, results):
         assert len(results) == sistema.k
 
-    def test_descending_order(self, sistema, dataset_available):
-        results = sistema.top_k()
+    def test_descending_order(self, results):
         scores = [score for score, _ in results]
         assert scores == sorted(scores, reverse=True)
 
-    def test_positive_scores(self, sistema, dataset_available):
-        results = sistema.top_k()
+    def test_positive_scores(self, results):
         for score, _ in results:
             assert score > 0
 
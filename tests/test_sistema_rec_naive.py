@@ -0,0 +1,48 @@
+"""Tests para SistemaRecNaive (no requieren dataset)."""
+
+import random
+from array import array
+
+import pytest
+
+from sistema_rec.agregacion import Agregacion
+from sistema_rec.sistema_rec_naive import SistemaRecNaive
+
+
+def full_sort_top_k(agg: Agregacion, k: int) -> list[tuple[float, str]]:
+    """Referencia: ordena las n tuplas (score, asin) y toma las K primeras."""
+    scores = SistemaRecNaive.compute_scores(agg.sums, agg.counts).tolist()
+    scored = list(zip(scores, agg.asins))
+    scored.sort(reverse=True)
+    return scored[:k]
+
+
+@pytest.fixture()
+def aggregated():
+    """Agregación sintética con muchos empates de score."""
+    rng = random.Random(7)
+    asins, sums, counts = [], array("d"), array("q")
+    for i in range(500):
+        count = rng.randint(1, 4)
+        asins.append(f"P{i:04d}")
+        sums.append(float(rng.randint(1, 5) * count))
+        counts.append(count)
+    return Agregacion(asins, sums, counts)
+
+
+class TestSistemaRecNaiveTopK:
+
+    @pytest.mark.parametrize("k", [1, 5, 37, 500, 800])
+    def test_matches_full_sort(self, aggregated, k):
+        sistema = SistemaRecNaive(k=k)
+        assert sistema.top_k(aggregated) == full_sort_top_k(aggregated, k)
+
+    def test_k_zero(self, aggregated):
+        assert SistemaRecNaive(k=0).top_k(aggregated) == []
+
+    def test_top_k_from_aggregated_does_not_mutate(self, aggregated):
+        snapshot = Agregacion(list(aggregated.asins), array("d", aggregated.sums),
+                              array("q", aggregated.counts))
+        result = SistemaRecNaive.top_k_from_aggregated(aggregated, 10)
+        assert result == full_sort_top_k(aggregated, 10)
+        assert aggregated == snapshot